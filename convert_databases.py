@@ -4,11 +4,32 @@ Reads the three .xlsx source files and writes compact JSON data files
 consumed by the ChemE Units web app.
 
 Run once:  python convert_databases.py
+Workbooks whose JSON output is newer than the .xlsx are skipped; pass
+--force to regenerate everything.
 """
 
-import json
 import os
-import openpyxl
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+    import openpyxl
+
+try:
+    import orjson
+
+    def dumps(obj):
+        """Serialize *obj* to compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def dumps(obj):
+        """Serialize *obj* to compact UTF-8 JSON bytes."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE, "data")
@@ -24,148 +45,196 @@ def safe(v):
         return v
     return str(v)
 
+def _cell(v):
+    """Normalise a calamine cell to what openpyxl would return for it."""
+    if v == "":
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+def read_sheets(filename, *sheets):
+    """Return the rows (header included) of each named sheet in *filename*."""
+    path = os.path.join(BASE, filename)
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(path)
+        # skip_empty_area=False keeps rows anchored at A1 like openpyxl, so the
+        # positional column indexes and the header-row skip line up.
+        return [
+            [tuple(_cell(v) for v in row)
+             for row in wb.get_sheet_by_name(name).to_python(skip_empty_area=False)]
+            for name in sheets
+        ]
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [list(wb[name].iter_rows(values_only=True)) for name in sheets]
+    finally:
+        wb.close()
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. UNITS DATABASE
 # ─────────────────────────────────────────────────────────────────────────────
-print("Processing units_database.xlsx …")
-wb_u = openpyxl.load_workbook(os.path.join(BASE, "units_database.xlsx"))
-
-# --- units (main sheet) ---
-ws_u = wb_u["units_database"]
-units = {}
-headers = [c.value for c in ws_u[1]]
-for row in ws_u.iter_rows(min_row=2, values_only=True):
-    sym = row[0]
-    factor = row[4]
-    if sym and factor is not None and isinstance(factor, (int, float)):
-        dim = {
-            "M":  row[7]  or 0,
-            "L":  row[8]  or 0,
-            "T":  row[9]  or 0,
-            "Th": row[10] or 0,
-            "N":  row[11] or 0,
-            "I":  row[12] or 0,
-            "J":  row[13] or 0,
-        }
-        units[str(sym)] = {
+# Base dimensions (mass, length, time, temperature, amount, current,
+# luminous intensity) and the sheet columns holding their exponents.
+_DIM_KEYS = ("M", "L", "T", "Th", "N", "I", "J")
+_UNITS_DIM_COLS = (7, 8, 9, 10, 11, 12, 13)
+_DERIVED_DIM_COLS = (3, 4, 5, 6, 7, 8, 9)
+
+def convert_units():
+    """Convert units_database.xlsx into data/units_data.json."""
+    rows_u, rows_p, rows_d = read_sheets("units_database.xlsx",
+                                         "units_database", "SI_prefixes", "derived_units")
+
+    # --- units (main sheet) ---
+    units = {}
+    for row in rows_u[1:]:
+        sym = row[0]
+        factor = row[4]
+        if sym and factor is not None and isinstance(factor, (int, float)):
+            dim = {k: row[i] or 0 for k, i in zip(_DIM_KEYS, _UNITS_DIM_COLS)}
+            units[str(sym)] = {
+                "name":   str(row[1]) if row[1] else str(sym),
+                "factor": float(factor),
+                "dim":    dim,
+            }
+
+    # --- SI prefixes ---
+    prefixes = {}
+    for row in rows_p[1:]:
+        if row[1] and row[2] is not None:
+            prefixes[str(row[1])] = {
+                "name":   str(row[0]),
+                "factor": float(row[2]),
+            }
+
+    # --- derived units ---
+    derived = {}
+    for row in rows_d[1:]:
+        sym = row[0]
+        if not sym:
+            continue
+        dim = {k: row[i] or 0 for k, i in zip(_DIM_KEYS, _DERIVED_DIM_COLS)}
+        derived[str(sym)] = {
             "name":   str(row[1]) if row[1] else str(sym),
-            "factor": float(factor),
+            "expr":   str(row[2]) if row[2] else "",
             "dim":    dim,
+            "factor": float(row[10]) if row[10] is not None else 1.0,
         }
 
-# --- SI prefixes ---
-ws_p = wb_u["SI_prefixes"]
-prefixes = {}
-for row in ws_p.iter_rows(min_row=2, values_only=True):
-    if row[1] and row[2] is not None:
-        prefixes[str(row[1])] = {
-            "name":   str(row[0]),
-            "factor": float(row[2]),
-        }
-
-# --- derived units ---
-ws_d = wb_u["derived_units"]
-derived = {}
-for row in ws_d.iter_rows(min_row=2, values_only=True):
-    sym = row[0]
-    if not sym:
-        continue
-    dim = {
-        "M":  row[3] or 0,
-        "L":  row[4] or 0,
-        "T":  row[5] or 0,
-        "Th": row[6] or 0,
-        "N":  row[7] or 0,
-        "I":  row[8] or 0,
-        "J":  row[9] or 0,
+    units_data = {
+        "units": units,
+        "prefixes": prefixes,
+        "derived": derived,
     }
-    derived[str(sym)] = {
-        "name":   str(row[1]) if row[1] else str(sym),
-        "expr":   str(row[2]) if row[2] else "",
-        "dim":    dim,
-        "factor": float(row[10]) if row[10] is not None else 1.0,
-    }
-
-units_data = {
-    "units": units,
-    "prefixes": prefixes,
-    "derived": derived,
-}
 
-path_u = os.path.join(DATA_DIR, "units_data.json")
-with open(path_u, "w", encoding="utf-8") as f:
-    json.dump(units_data, f, ensure_ascii=False, separators=(",", ":"))
-print(f"  -> {len(units)} units, {len(prefixes)} prefixes, {len(derived)} derived  ->  {path_u}")
+    path_u = os.path.join(DATA_DIR, "units_data.json")
+    with open(path_u, "wb") as f:
+        f.write(dumps(units_data))
+    return ("Processing units_database.xlsx …\n"
+            f"  -> {len(units)} units, {len(prefixes)} prefixes, {len(derived)} derived  ->  {path_u}")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 2. PERIODIC TABLE
 # ─────────────────────────────────────────────────────────────────────────────
-print("Processing periodic_table.xlsx …")
-wb_pt = openpyxl.load_workbook(os.path.join(BASE, "periodic_table.xlsx"))
-ws_pt = wb_pt["periodic_table"]
-
-elements = []
-for row in ws_pt.iter_rows(min_row=2, values_only=True):
-    Z = row[0]
-    sym = row[1]
-    name = row[2]
-    aw = row[3]
-    if Z is None or sym is None:
-        continue
-    elements.append({
-        "Z":       int(Z),
-        "symbol":  str(sym),
-        "name":    str(name) if name else str(sym),
-        "weight":  float(aw) if isinstance(aw, (int, float)) else None,
-        "category": str(row[6]) if row[6] else "Unknown",
-        "period":  int(row[7]) if row[7] else None,
-        "group":   int(row[8]) if isinstance(row[8], (int, float)) else None,
-        "block":   str(row[9]) if row[9] else None,
-        "phase":   str(row[18]) if row[18] else None,
-        "melt_K":  float(row[14]) if isinstance(row[14], (int, float)) else None,
-        "boil_K":  float(row[15]) if isinstance(row[15], (int, float)) else None,
-        "density": float(row[16]) if isinstance(row[16], (int, float)) else None,
-        "electronegativity": float(row[11]) if isinstance(row[11], (int, float)) else None,
-    })
-
-path_pt = os.path.join(DATA_DIR, "periodic_table.json")
-with open(path_pt, "w", encoding="utf-8") as f:
-    json.dump(elements, f, ensure_ascii=False, separators=(",", ":"))
-print(f"  -> {len(elements)} elements  ->  {path_pt}")
+def convert_periodic():
+    """Convert periodic_table.xlsx into data/periodic_table.json."""
+    (rows_pt,) = read_sheets("periodic_table.xlsx", "periodic_table")
+
+    elements = []
+    for row in rows_pt[1:]:
+        Z = row[0]
+        sym = row[1]
+        name = row[2]
+        aw = row[3]
+        if Z is None or sym is None:
+            continue
+        elements.append({
+            "Z":       int(Z),
+            "symbol":  str(sym),
+            "name":    str(name) if name else str(sym),
+            "weight":  float(aw) if isinstance(aw, (int, float)) else None,
+            "category": str(row[6]) if row[6] else "Unknown",
+            "period":  int(row[7]) if row[7] else None,
+            "group":   int(row[8]) if isinstance(row[8], (int, float)) else None,
+            "block":   str(row[9]) if row[9] else None,
+            "phase":   str(row[18]) if row[18] else None,
+            "melt_K":  float(row[14]) if isinstance(row[14], (int, float)) else None,
+            "boil_K":  float(row[15]) if isinstance(row[15], (int, float)) else None,
+            "density": float(row[16]) if isinstance(row[16], (int, float)) else None,
+            "electronegativity": float(row[11]) if isinstance(row[11], (int, float)) else None,
+        })
+
+    path_pt = os.path.join(DATA_DIR, "periodic_table.json")
+    with open(path_pt, "wb") as f:
+        f.write(dumps(elements))
+    return ("Processing periodic_table.xlsx …\n"
+            f"  -> {len(elements)} elements  ->  {path_pt}")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3. ENGINEERING CONSTANTS
 # ─────────────────────────────────────────────────────────────────────────────
-print("Processing engineering_constants.xlsx …")
-wb_c = openpyxl.load_workbook(os.path.join(BASE, "engineering_constants.xlsx"))
-ws_c = wb_c["engineering_constants"]
-
-constants = []
-current_category = "General"
-for row in ws_c.iter_rows(min_row=2, values_only=True):
-    sym = row[0]
-    name = row[1]
-    value = row[2]
-    unit = row[4]
-    cat = row[7]
-
-    # Category header rows (only first col has value, rest are None)
-    if sym and value is None and name is None:
-        current_category = str(sym)
-        continue
-    if sym and name and isinstance(value, (int, float)):
-        constants.append({
-            "symbol":   str(sym),
-            "name":     str(name),
-            "value":    float(value),
-            "unit":     str(unit) if unit else "",
-            "category": str(cat) if cat else current_category,
-            "uncertainty": str(row[3]) if row[3] else "",
-        })
-
-path_c = os.path.join(DATA_DIR, "constants.json")
-with open(path_c, "w", encoding="utf-8") as f:
-    json.dump(constants, f, ensure_ascii=False, separators=(",", ":"))
-print(f"  -> {len(constants)} constants  ->  {path_c}")
+def convert_constants():
+    """Convert engineering_constants.xlsx into data/constants.json."""
+    (rows_c,) = read_sheets("engineering_constants.xlsx", "engineering_constants")
+
+    constants = []
+    current_category = "General"
+    for row in rows_c[1:]:
+        sym = row[0]
+        name = row[1]
+        value = row[2]
+        unit = row[4]
+        cat = row[7]
+
+        # Category header rows (only first col has value, rest are None)
+        if sym and value is None and name is None:
+            current_category = str(sym)
+            continue
+        if sym and name and isinstance(value, (int, float)):
+            constants.append({
+                "symbol":   str(sym),
+                "name":     str(name),
+                "value":    float(value),
+                "unit":     str(unit) if unit else "",
+                "category": str(cat) if cat else current_category,
+                "uncertainty": str(row[3]) if row[3] else "",
+            })
+
+    path_c = os.path.join(DATA_DIR, "constants.json")
+    with open(path_c, "wb") as f:
+        f.write(dumps(constants))
+    return ("Processing engineering_constants.xlsx …\n"
+            f"  -> {len(constants)} constants  ->  {path_c}")
 
-print("\nAll done! JSON files are in ./data/")
+# ─────────────────────────────────────────────────────────────────────────────
+# Convert each workbook whose JSON output is older than its source spreadsheet.
+# Calamine finishes all three in milliseconds, so worker processes only pay
+# off for the slower openpyxl fallback.
+# ─────────────────────────────────────────────────────────────────────────────
+JOBS = (
+    (convert_units,     "units_database.xlsx",        "units_data.json"),
+    (convert_periodic,  "periodic_table.xlsx",        "periodic_table.json"),
+    (convert_constants, "engineering_constants.xlsx", "constants.json"),
+)
+
+def needs_rebuild(src, dst):
+    """True if *dst* is missing or older than *src* or this script."""
+    if not os.path.exists(dst):
+        return True
+    return max(os.path.getmtime(src), os.path.getmtime(__file__)) > os.path.getmtime(dst)
+
+if __name__ == "__main__":
+    force = "--force" in sys.argv[1:]
+    stale = [job for job, src, dst in JOBS
+             if force or needs_rebuild(os.path.join(BASE, src), os.path.join(DATA_DIR, dst))]
+
+    if CalamineWorkbook is None and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=len(stale)) as ex:
+            futures = {job: ex.submit(job) for job in stale}
+            summaries = {job: fut.result() for job, fut in futures.items()}
+    else:
+        summaries = {job: job() for job in stale}
+    for job, src, dst in JOBS:
+        print(summaries.get(job, f"Skipping {src} … (up to date)"))
+
+    print("\nAll done! JSON files are in ./data/")